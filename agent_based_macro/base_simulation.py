@@ -41,6 +41,8 @@ Copyright 2021 Brian Romanchuk
 """
 import enum
 import math
+import weakref
+from contextlib import contextmanager
 
 import agent_based_macro.entity
 from agent_based_macro import errors
@@ -51,6 +53,8 @@ import agent_based_macro.simulation as simulation
 
 
 class Location(agent_based_macro.entity.Entity):
+    HasLocation = True
+
     def __init__(self, name):
         super().__init__(name=name, ttype='location')
         # Duh!
@@ -66,15 +70,18 @@ class Location(agent_based_macro.entity.Entity):
         :return:
         """
         self.EntityList = []
-        sim = agent_based_macro.entity.Entity.get_entity(agent_based_macro.entity.SIMULATION_ID)
-        # For simplicity, do this in a loop
-        for ent in sim.EntityList:
-            if ent.GID == self.GID:
+        sim = simulation.get_simulation()
+        # Read from the per-location index instead of scanning every entity; re-validate
+        # since entities may have died or moved since they were indexed.
+        for gid in sim.EntitiesByLocation.get(self.LocationID, ()):
+            if gid == self.GID:
                 continue
-            if ent.IsDead:
+            try:
+                ent = self.get_entity(gid)
+            except KeyError:
                 continue
-            if hasattr(ent, 'LocationID') and ent.LocationID == self.LocationID:
-                self.EntityList.append(ent.GID)
+            if ent.LocationID == self.LocationID:
+                self.EntityList.append(gid)
 
     def generate_market_list(self):
         self.MarketList = []
@@ -110,7 +117,28 @@ class ReserveType(enum.Enum):
     WAGES = 3
 
 
+class NamedOrderSlot(enum.IntEnum):
+    """
+    Slots for the "named" orders kept by agents.
+
+    The closed set of order names is known up front, so each gets a fixed integer slot.
+    This keeps the named-order bookkeeping as a list index rather than building and
+    hashing prefixed name strings on every order submission. The buy/sell split is
+    baked into the slot, so there is no collision between a buy and a sell that would
+    otherwise share a name.
+    """
+    BUY_FLOOR = 0
+    BUY_DAILY_BID = 1
+    BUY_MARKET_ORDER = 2
+    SELL_PRODUCTION = 3
+    SELL_EMERGENCY = 4
+
+
 class InventoryInfo(object):
+    # One of these exists per (agent, commodity) and is hit on every fill; __slots__
+    # keeps it small and makes the attribute access a C-level slot read.
+    __slots__ = ('CommodityID', 'Amount', 'Cost', 'Reserved')
+
     def __init__(self, commodity_id):
         self.CommodityID = commodity_id
         self.Amount = 0
@@ -127,6 +155,10 @@ class InventoryInfo(object):
         :param cost: int
         :return:
         """
+        if amount == 0 and cost == 0:
+            # Keep the zero/zero case cheap; amount=0 with a cost is a valuation
+            # adjustment and falls through.
+            return
         if amount < 0:
             raise ValueError('Cannot add negative amounts! to inventory')
         self.Amount += amount
@@ -138,6 +170,8 @@ class InventoryInfo(object):
         :param amount: int
         :return:
         """
+        if amount == 0:
+            return
         if amount + self.Reserved > self.Amount:
             raise errors.CommodityReserveError('Attempting to reserve more than exists')
         self.Reserved += amount
@@ -153,6 +187,10 @@ class InventoryInfo(object):
         :param from_reserve: bool
         :return: int
         """
+        if amount == 0:
+            # No units removed, no COGS (also keeps the division below safe when the
+            # holding itself is empty).
+            return 0
         if amount < 0:
             raise ValueError('Cannot remove negative amounts from inventory')
         if amount > self.Amount:
@@ -165,10 +203,9 @@ class InventoryInfo(object):
                 raise ValueError('Attempting to remove more than reserved')
             self.Reserved -= amount
         # cogs = COGS = standard acronym for "cost of goods sold"
-        if amount == self.Amount:
-            cogs = self.Cost
-        else:
-            cogs = round(float(self.Cost * amount) / float(self.Amount))
+        # Integer round-half-up division; exact (cogs == Cost) when amount == Amount,
+        # so no special case needed, and no float conversions.
+        cogs = (self.Cost * amount + self.Amount // 2) // self.Amount
         self.Cost -= cogs
         self.Amount -= amount
         return cogs
@@ -179,6 +216,7 @@ class Inventory(object):
     Container object to hold all inventory information.
     Not an Entity, since will always be embedded in an Entity.
     """
+    __slots__ = ('Commodities',)
 
     def __init__(self):
         # We can have multiple commodities in inventory, store all information
@@ -191,10 +229,15 @@ class Inventory(object):
         :param item: int
         :return: InventoryInfo
         """
-        if item not in self.Commodities:
+        try:
+            # Existing commodity is the hot path: one dict lookup instead of a
+            # membership test followed by an index.
+            return self.Commodities[item]
+        except KeyError:
             # If we were cautious, validate that "item" is a commodityID
-            self.Commodities[item] = InventoryInfo(item)
-        return self.Commodities[item]
+            info = InventoryInfo(item)
+            self.Commodities[item] = info
+            return info
 
     def get_representation_info(self):
         out = [(x, y.Amount, y.Cost) for x, y in self.Commodities.items()]
@@ -221,6 +264,7 @@ class Agent(agent_based_macro.entity.Entity):
     Making the decision rules functions will make it easy for people to muck around with Agent behaviour without
     having to know too much about object-oriented coding (they will need to access data members, but that is natural).
     """
+    HasLocation = True
 
     def __init__(self, name, money_balance=0, location_id=None):
         super().__init__(name, 'agent')
@@ -234,11 +278,14 @@ class Agent(agent_based_macro.entity.Entity):
         self.TopParentID = self.GID
         self.Employer = False
         self.Inventory = Inventory()
-        self.NamedOrders = {}
+        self.NamedOrders = [None] * len(NamedOrderSlot)
         # We allow central government entities to run negative money balances, because MMT
         self.IsCentralGovernment = False
         self.SeriesBase = f'{name}@{location_id}'
         self.RegisteredSeries = dict()
+        # Agents call into the Simulation constantly (time series, taxes); embed the
+        # reference like Market does rather than re-resolving the global per call.
+        self.Simulation = simulation.get_simulation()
         # Worker management
         self.IsEmployer = False
         self.WorkersActual = 0
@@ -253,16 +300,17 @@ class Agent(agent_based_macro.entity.Entity):
         :return:
         """
         full_name = f'{self.SeriesBase}|{series_name}'
-        simulation.get_simulation().register_time_series(full_name)
-        self.RegisteredSeries[series_name] = full_name
+        # Keep the TimeSeries object itself, so writes skip the full-name lookup in
+        # the simulation's series dict.
+        self.RegisteredSeries[series_name] = self.Simulation.register_time_series(full_name)
 
     def time_series_set(self, name, value):
         try:
-            full_name = self.RegisteredSeries[name]
+            ts = self.RegisteredSeries[name]
         except KeyError:
             # Not registered, do nothing
             return
-        simulation.get_simulation().time_series_set(full_name, value)
+        ts.set(value, self.Simulation.Time)
 
     def receive_money(self, amount):
         """
@@ -270,6 +318,8 @@ class Agent(agent_based_macro.entity.Entity):
         :param amount: int
         :return:
         """
+        if amount == 0:
+            return
         if amount < 0:
             self.spend_money(-amount)
             return
@@ -292,28 +342,31 @@ class Agent(agent_based_macro.entity.Entity):
         :param from_reserve: ReserveType
         :return:
         """
+        if amount == 0:
+            # Nothing to do; skip the branch ladder.
+            return
         if amount < 0:
-            if not ReserveType.NONE == from_reserve:
+            if from_reserve is not ReserveType.NONE:
                 raise ValueError('Attempting to spend negative amount from a reserve - huh?')
             self.receive_money(-amount)
             return
         if amount > self.Money:
             raise NoMoneyError(f'Too much money: [{self.GID}] ${amount}')
-        if ReserveType.NONE == from_reserve:
+        if from_reserve is ReserveType.NONE:
             if amount + self.ReserveMoney > self.Money:
                 raise NoFreeMoneyError(f'Spending beyond reserves: [{self.GID}]')
             # Otherwise, transaction succeeds
             self.Money -= amount
             return
-        elif ReserveType.ORDERS == from_reserve:
+        elif from_reserve is ReserveType.ORDERS:
             if amount > self.ReserveOrders:
                 raise NoFreeMoneyError(f'Order spend beyond reserves [{self.GID}]')
             self.ReserveOrders -= amount
-        elif ReserveType.WAGES == from_reserve:
+        elif from_reserve is ReserveType.WAGES:
             if amount > self.ReserveWages:
                 raise NoFreeMoneyError(f'Wage spend beyond reserves [{self.GID}]')
             self.ReserveWages -= amount
-        elif ReserveType.TAX == from_reserve:
+        elif from_reserve is ReserveType.TAX:
             if amount > self.ReserveTax:
                 raise NoFreeMoneyError(f'Tax spend beyond reserves [{self.GID}]')
             self.ReserveTax -= amount
@@ -329,34 +382,36 @@ class Agent(agent_based_macro.entity.Entity):
         :param reserve_type: ReserveType
         :return:
         """
+        if change == 0:
+            return
         if change > 0:
             # Central government entities ignore money reserves.
             # TODO: override do_accounting() in the central government classes.
             if (not self.IsCentralGovernment) and (change + self.ReserveMoney > self.Money):
                 raise NoFreeMoneyError(f'Attempting to set reserves beyond money [{self.GID}]')
             # OK, let's do this
-            if ReserveType.ORDERS == reserve_type:
+            if reserve_type is ReserveType.ORDERS:
                 self.ReserveOrders += change
-            elif ReserveType.TAX == reserve_type:
+            elif reserve_type is ReserveType.TAX:
                 self.ReserveTax += change
-            elif ReserveType.WAGES == reserve_type:
+            elif reserve_type is ReserveType.WAGES:
                 self.ReserveWages += change
             else:
                 raise ValueError('Must specify valid reserve type')
             self.ReserveMoney += change
         else:
             # Decrease: always possible if reserves already exist.
-            if ReserveType.ORDERS == reserve_type:
+            if reserve_type is ReserveType.ORDERS:
                 if self.ReserveOrders >= -change:
                     self.ReserveOrders += change
                 else:
                     raise ReserveError(f'attempt to set negative reserves [{self.GID}]')
-            elif ReserveType.WAGES == reserve_type:
+            elif reserve_type is ReserveType.WAGES:
                 if self.ReserveWages >= -change:
                     self.ReserveWages += change
                 else:
                     raise ReserveError(f'attempt to set negative reserves [{self.GID}]')
-            elif ReserveType.TAX == reserve_type:
+            elif reserve_type is ReserveType.TAX:
                 if self.ReserveTax >= -change:
                     self.ReserveTax += change
                 else:
@@ -413,10 +468,14 @@ class Agent(agent_based_macro.entity.Entity):
         :return:
         """
         # Switch to match when I install Python 10...
-        if operation == 'add':
+        # 'fill' first: an order is added/removed once, but can fill many times.
+        if operation == 'fill':
+            # Pay out of the order reserve and take delivery.
+            payment = amount * price
+            self.spend_money(payment, from_reserve=ReserveType.ORDERS)
+            self.Inventory[commodity_id].add_inventory(amount, payment)
+        elif operation == 'add':
             self.change_reserves(amount * price, reserve_type=ReserveType.ORDERS)
-        elif operation == 'fill':
-            self.buy_goods(commodity_id, amount, amount * price)
         elif operation == 'remove':
             self.change_reserves(-amount * price, reserve_type=ReserveType.ORDERS)
         else:
@@ -432,32 +491,17 @@ class Agent(agent_based_macro.entity.Entity):
         :param commodity_id: int
         :return:
         """
-        if operation == 'add':
+        if operation == 'fill':
+            # Collect the payment, and expense the COGS out of reserved inventory.
+            self.receive_money(amount * price)
+            cogs = self.Inventory[commodity_id].remove_inventory(amount, from_reserve=True)
+        elif operation == 'add':
             self.Inventory[commodity_id].change_reserves(amount)
-        elif operation == 'fill':
-            self.sell_goods(commodity_id, amount, amount * price)
         elif operation == 'remove':
             self.Inventory[commodity_id].change_reserves(-amount)
         else:
             raise ValueError(f'Unsupported operation {operation}')
 
-    def buy_goods(self, commodity_id, amount, payment):
-        """
-        Do the operations for buying a good.
-
-        :param commodity_id: int
-        :param amount: int
-        :param payment: int
-        :return:
-        """
-        self.spend_money(payment, from_reserve=ReserveType.ORDERS)
-        self.Inventory[commodity_id].add_inventory(amount, payment)
-
-    def sell_goods(self, commodity_id, amount, payment):
-        self.receive_money(payment)
-        # Need to expense COGS
-        cogs = self.Inventory[commodity_id].remove_inventory(amount, from_reserve=True)
-
     def get_info(self):
         return f'{self.GID}'
 
@@ -470,6 +514,13 @@ class ProductionAgent(Agent):
     def __init__(self, name, money_balance=0, location_id=None):
         super().__init__(name, money_balance=money_balance, location_id=location_id)
         self.ProductivityMultiplier = 1.
+        # Location productivity is static per (location, commodity), and production
+        # agents do not move, so cache it rather than re-fetching the Location entity
+        # on every production event.
+        self.BaseProductivityCache = {}
+        # Memoized unit cost: (Wage, ProductivityMultiplier, commodity_id, value).
+        # Validated against the inputs on read, so it can never go stale.
+        self.UnitCostCache = None
 
     def get_productivity(self, commodity_id):
         """
@@ -480,8 +531,11 @@ class ProductionAgent(Agent):
         :param commodity_id: int
         :return: float
         """
-        loc = agent_based_macro.entity.Entity.get_entity(self.LocationID)
-        base_productivity = loc.ProductivityDict[commodity_id]
+        base_productivity = self.BaseProductivityCache.get(commodity_id)
+        if base_productivity is None:
+            loc = agent_based_macro.entity.Entity.get_entity(self.LocationID)
+            base_productivity = loc.ProductivityDict[commodity_id]
+            self.BaseProductivityCache[commodity_id] = base_productivity
         productivity = self.ProductivityMultiplier * base_productivity
         return productivity
 
@@ -509,7 +563,13 @@ class ProductionAgent(Agent):
         nonlinearities, so we need to calculate the daily production
         :return: float
         """
-        return self.Wage / self.get_productivity(commodity_id)
+        cached = self.UnitCostCache
+        if (cached is not None) and (cached[0] == self.Wage) and \
+                (cached[1] == self.ProductivityMultiplier) and (cached[2] == commodity_id):
+            return cached[3]
+        value = self.Wage / self.get_productivity(commodity_id)
+        self.UnitCostCache = (self.Wage, self.ProductivityMultiplier, commodity_id, value)
+        return value
 
     def get_daily_wage_bill(self):
         payment = self.WorkersActual * self.Wage
@@ -538,6 +598,12 @@ class HouseholdSector(Agent):
         super().__init__(name, money_balance, location_id=location_id)
         self.TargetMoney = target_money
         self.DailyEarnings = 0
+        # The market resolved by event_calculate_spending, reused by the follow-up
+        # event_market_order so the pair only does the commodity/market resolution once.
+        self.DailySpendMarket = None
+        # Lazily resolved 'Fud' commodity GID; commodities cannot be registered after
+        # setup, so the cached value never goes stale.
+        self.FoodID = None
 
     def receive_wages(self, amount):
         """
@@ -547,10 +613,10 @@ class HouseholdSector(Agent):
         :param amount:
         :return:
         """
-        sim = agent_based_macro.entity.Entity.get_entity(agent_based_macro.entity.SIMULATION_ID)
+        sim = self.Simulation
         self.receive_money(amount)
         # Do something more sophisticated for tax payment later.
-        taxes = math.floor(0.1 * amount)
+        taxes = amount // 10
         self.change_reserves(taxes, ReserveType.TAX)
         sim.pay_taxes(self.GID, taxes)
         self.DailyEarnings += (amount - taxes)
@@ -572,8 +638,9 @@ class HouseholdSector(Agent):
 
         :return:
         """
-        # Hard code parameters for now
-        daily_spend = int(0.7 * self.DailyEarnings + 0.01 * self.Money)
+        # Hard code parameters for now. Integer arithmetic: the monetary unit is an
+        # integer, so keep the whole pipeline out of floating point.
+        daily_spend = (7 * self.DailyEarnings) // 10 + self.Money // 100
         # Increase TargetMoney by the implied daily savings - possibly negative
         self.TargetMoney += (self.DailyEarnings - daily_spend)
         self.time_series_set('DailyEarnings', self.DailyEarnings)
@@ -582,31 +649,36 @@ class HouseholdSector(Agent):
         # Put in a order for 100% of available spending at a fixed offset below the ask price.
         # This will cancel any existing order, which will free up cash if the previous day's order
         # was not filled.
-        sim = agent_based_macro.entity.Entity.get_simulation()
-        food_id = sim.get_commodity_by_name('Fud')
-        location = agent_based_macro.entity.Entity.get_entity(self.LocationID)
-        market = sim.get_market(self.LocationID, food_id)
+        sim = self.Simulation
+        market = self.DailySpendMarket
+        if market is None:
+            # The location and the food commodity are static, so resolve the market once
+            # and keep it for later events.
+            if self.FoodID is None:
+                self.FoodID = sim.get_commodity_by_name('Fud')
+            market = sim.get_market(self.LocationID, self.FoodID)
+            self.DailySpendMarket = market
         ask = market.get_ask()
 
         # No ask price, no bid!
         if ask is not None:
-            bid_price = int(0.95 * ask)
+            bid_price = (19 * ask) // 20
             # Target amount of spending is is the minimum of
             # (1) self.Money - self.TargetMoney = equals the free room for spending, which would
             #     equal daily_spend if the sector spent the "maximum" amount the day before.
             # (2) 130% of daily spend. If we spent less than the maximum in previous days, allow for
             #     a bid beyond daily spending.
-            targ_spend = min(self.Money - self.TargetMoney, 1.3 * daily_spend)
+            targ_spend = min(self.Money - self.TargetMoney, (13 * daily_spend) // 10)
             # Need to deal with a corner case: what if self.TargetMoney > self.Money (somehow).
             # This would imply negative spending.
             # Make the spending at least 50% of daily_spend.
             # Eventually, self.Money will catch up to TargetMoney.
-            targ_spend = max(targ_spend, 0.5 * daily_spend)
-            amount = math.floor(targ_spend / bid_price)
+            targ_spend = max(targ_spend, daily_spend // 2)
+            amount = targ_spend // bid_price
             self.time_series_set('DailyBid', amount * bid_price)
             if amount > 0:
                 order = BuyOrder(bid_price, amount, self.GID)
-                market.add_named_buy(agent=self, name='DailyBid', order=order)
+                market.add_named_buy(agent=self, slot=NamedOrderSlot.BUY_DAILY_BID, order=order)
         # Then add an event for a market order
         sim.queue_event_delay(self.GID, self.event_market_order, .6)
         # Need to reset daily Earnings. Could be done as a separate event, but will need a time series
@@ -621,28 +693,34 @@ class HouseholdSector(Agent):
 
         :return:
         """
-        sim = agent_based_macro.entity.Entity.get_simulation()
-        food_id = sim.get_commodity_by_name('Fud')
-        location = agent_based_macro.entity.Entity.get_entity(self.LocationID)
-        market = sim.get_market(self.LocationID, food_id)
+        market = self.DailySpendMarket
+        if market is None:
+            # Not preceded by event_calculate_spending; resolve (and cache) from scratch.
+            sim = self.Simulation
+            if self.FoodID is None:
+                self.FoodID = sim.get_commodity_by_name('Fud')
+            market = sim.get_market(self.LocationID, self.FoodID)
+            self.DailySpendMarket = market
         ask = market.get_ask()
         if ask is None:
             # Nothing available, no market order!
             return
         available_money = self.Money - (self.TargetMoney + self.ReserveMoney)
-        to_spend = available_money * 0.3
+        to_spend = (3 * available_money) // 10
         # Since there may only be a teeny amount for sale at the ask, put a limit order with price
         # higher than the ask
-        price = 1.05 * ask
-        amount = math.floor(to_spend / price)
+        price = (21 * ask) // 20
+        amount = to_spend // price
         if amount < 1:
             return
         order = BuyOrder(price, amount, self.GID)
         self.time_series_set('MarketOrder', price * amount)
-        market.add_named_buy(agent=self, name='"MarketOrder"', order=order)
+        market.add_named_buy(agent=self, slot=NamedOrderSlot.BUY_MARKET_ORDER, order=order)
 
 
 class Market(agent_based_macro.entity.Entity, MarketBase):
+    HasLocation = True
+
     def __init__(self, name, location_id, commodity_id):
         agent_based_macro.entity.Entity.__init__(self, name, ttype='market')
         MarketBase.__init__(self)
@@ -651,6 +729,22 @@ class Market(agent_based_macro.entity.Entity, MarketBase):
         # Since the market will always be calling the Simulation to log transactions, embed a reference to
         # the Simulation inside the Market.
         self.Simulation = simulation.get_simulation()
+        # Cache of GID -> Agent for accounting callbacks. Weak references, so the cache does not
+        # extend entity lifetimes; a cache miss falls back to Entity.get_entity().
+        self.AgentCache = weakref.WeakValueDictionary()
+        # Cached get_representation() dict; cleared whenever the book changes, so
+        # repeated polls of a quiet market do no rebuilding.
+        self.ReprCache = None
+
+    def update_top_of_book(self):
+        """
+        Refresh the cached top of book, and invalidate the representation cache
+        (every book mutation ends with this call).
+
+        :return:
+        """
+        super().update_top_of_book()
+        self.ReprCache = None
 
     def get_time(self):
         """
@@ -660,8 +754,7 @@ class Market(agent_based_macro.entity.Entity, MarketBase):
 
         :return: float
         """
-        sim = Entity.get_simulation()
-        return sim.Time
+        return self.Simulation.Time
 
     def do_accounting(self, firm_gid, order_type, operation, amount, price):
         """
@@ -674,69 +767,69 @@ class Market(agent_based_macro.entity.Entity, MarketBase):
         :param price: int
         :return:
         """
-        agent: Agent = Entity.get_entity(firm_gid)
+        agent: Agent = self.AgentCache.get(firm_gid)
+        if agent is None:
+            agent = Entity.get_entity(firm_gid)
+            self.AgentCache[firm_gid] = agent
         agent.do_accounting(order_type, operation, amount, price, self.CommodityID)
 
-    def add_named_buy(self, agent, name, order):
+    def add_named_buy(self, agent, slot, order):
         """
-        Allow agents to keep a "named" order. New orders automatically cancel order with the same name.
+        Allow agents to keep a "named" order. New orders automatically cancel the order in the same slot.
         :param agent: Agent
-        :param name: str
+        :param slot: NamedOrderSlot
         :param order: BuyOrder
         :return:
         """
-        name = 'buy_' + name
-        id_existing = agent.NamedOrders.get(name, None)
+        id_existing = agent.NamedOrders[slot]
         if id_existing is not None:
             self.remove_order(id_existing)
         self.add_buy(order)
-        agent.NamedOrders[name] = order.OrderID
+        agent.NamedOrders[slot] = order.OrderID
 
-    def add_named_sell(self, agent, name, order):
+    def add_named_sell(self, agent, slot, order):
         """
-        Allow agents to keep a "named" order. New orders automatically cancel order with the same name.
+        Allow agents to keep a "named" order. New orders automatically cancel the order in the same slot.
         :param agent: Agent
-        :param name: str
-        :param order: BuyOrder
+        :param slot: NamedOrderSlot
+        :param order: SellOrder
         :return:
         """
-        name = 'sel_' + name
-        id_existing = agent.NamedOrders.get(name, None)
+        id_existing = agent.NamedOrders[slot]
         if id_existing is not None:
             self.remove_order(id_existing)
         self.add_sell(order)
-        agent.NamedOrders[name] = order.OrderID
+        agent.NamedOrders[slot] = order.OrderID
 
     def get_bid(self):
-        if len(self.BuyList) > 0:
-            return self.BuyList[0].Price
+        if self.BestBid is not None:
+            return self.BestBid[0]
         else:
             return None
 
     def get_ask(self):
-        if len(self.SellList) > 0:
-            return self.SellList[0].Price
+        if self.BestAsk is not None:
+            return self.BestAsk[0]
         else:
             return None
 
     def get_representation(self):
-        info = super().get_representation()
-        info['Location'] = self.LocationID
-        info['CommodityID'] = self.CommodityID
-        if len(self.BuyList) > 0:
-            info['BidPrice'] = self.BuyList[0].Price
-            info['BidSize'] = self.BuyList[0].Amount
-        else:
-            info['BidPrice'] = None
-            info['BidSize'] = None
-        if len(self.SellList) > 0:
-            info['AskPrice'] = self.SellList[0].Price
-            info['AskSize'] = self.SellList[0].Amount
-        else:
-            info['AskPrice'] = None
-            info['AskSize'] = None
-        info['LastPrice'] = self.LastPrice
-        info['LastTime'] = self.LastTime
+        info = self.ReprCache
+        if info is None:
+            bid_price, bid_size = self.BestBid if self.BestBid is not None else (None, None)
+            ask_price, ask_size = self.BestAsk if self.BestAsk is not None else (None, None)
+            # Build the dict in one literal (sized once) instead of mutating the parent
+            # dict key by key. (Callers treat the representation as read-only.)
+            info = {**super().get_representation(),
+                    'Location': self.LocationID,
+                    'CommodityID': self.CommodityID,
+                    'BidPrice': bid_price,
+                    'BidSize': bid_size,
+                    'AskPrice': ask_price,
+                    'AskSize': ask_size,
+                    'LastPrice': self.LastPrice,
+                    'LastTime': self.LastTime}
+            self.ReprCache = info
         return info
 
     def log_transaction(self, buy_id, sell_id, initiated_id, amount, price):
@@ -753,6 +846,19 @@ class Market(agent_based_macro.entity.Entity, MarketBase):
         self.Simulation.log_transaction(self.GID, buy_id, sell_id, initiated_id, amount, price)
 
 
+def market_key(loc_id, commod_id):
+    """
+    Pack a (location GID, commodity GID) pair into a single int key for the Markets
+    dict. GIDs are small sequential ints, so 32 bits each is ample, and hashing one
+    int is cheaper than hashing a tuple on every market lookup.
+
+    :param loc_id: int
+    :param commod_id: int
+    :return: int
+    """
+    return (loc_id << 32) | commod_id
+
+
 class BaseSimulation(simulation.Simulation):
     """
     Class to manage the setup of entities.
@@ -763,18 +869,36 @@ class BaseSimulation(simulation.Simulation):
         Set up data, add CentralGovernment
         """
         self.CentralGovernmentID = None
+        self.CentralGovernment = None
         super().__init__()
         self.Locations = []
         self.Commodities = []
+        # Name -> GID index, so name lookups do not scan the commodity list.
+        self.CommoditiesByName = {}
         self.Markets = {}
         self.Households = {}
+        # LocationID -> HouseholdSector object, so the per-wage-payment lookup does
+        # not have to go through the entity table.
+        self.HouseholdRefs = {}
+        # LocationID -> [GID] index maintained in add_entity(), so per-location scans
+        # do not have to walk the full EntityList. Entries can go stale if an entity
+        # dies or moves, so readers re-validate the LocationID.
+        self.EntitiesByLocation = {}
         # Could be a weakref, but JG will not disappear
         self.JGLookup = {}
         gov = CentralGovernment()
         self.add_entity(gov)
         self.CentralGovernmentID = gov.GID
+        # Direct reference, so tax/wage flows skip the entity-table lookup. (EntityList
+        # holds the strong reference; this one just avoids the per-call resolve.)
+        self.CentralGovernment = gov
+        # Accumulator used by bulk_add(); None means "apply adjustments immediately".
+        self.PendingGovernmentDelta = None
         # A location that is not really a location -- off the logical grid.
         self.NonLocationID = None
+        # Location GID -> Coordinates, filled in add_location(). Used by movement code
+        # and nearest_location() so they do not have to resolve the Location entity.
+        self.LocationCoords = {}
         # For invalid actions for players, send a message to the client, otherwise throw an error.
         # Need to keep a list of Agents that are player-associated.
         self.PlayerGID = set()
@@ -789,35 +913,64 @@ class BaseSimulation(simulation.Simulation):
         :return:
         """
         super().add_entity(entity)
-        if hasattr(entity, 'Money'):
-            try:
-                gov = agent_based_macro.entity.Entity.get_entity(self.CentralGovernmentID)
-            except KeyError:
-                # This will blow up when we add the CentralGovernment itself!
-                return
-            gov.Money -= entity.Money
+        if entity.HasLocation and entity.LocationID is not None:
+            self.EntitiesByLocation.setdefault(entity.LocationID, []).append(entity.GID)
+        gov = self.CentralGovernment
+        if gov is not None:
+            money = getattr(entity, 'Money', None)
+            if money is not None:
+                if self.PendingGovernmentDelta is not None:
+                    # Inside bulk_add(): coalesce into one adjustment on exit.
+                    self.PendingGovernmentDelta += money
+                else:
+                    gov.Money -= money
+
+    @contextmanager
+    def bulk_add(self):
+        """
+        Context manager for adding many entities at once: the CentralGovernment money
+        adjustments are accumulated and applied once on exit, instead of one write per
+        entity.
+
+        with sim.bulk_add():
+            sim.add_entity(...)
+
+        :return:
+        """
+        self.PendingGovernmentDelta = 0
+        try:
+            yield
+        finally:
+            delta = self.PendingGovernmentDelta
+            self.PendingGovernmentDelta = None
+            if delta:
+                self.CentralGovernment.Money -= delta
 
     def register_actions(self):
         super(BaseSimulation, self).register_actions()
-        Action.add_action_type('PayWages', BaseSimulation.process_action, ('payment',), '')
-        Action.add_action_type('ProductionLabour', BaseSimulation.process_action, ('commodity', 'num_workers',
-                                                                                   'payment',), '')
-        Action.add_action_type('AddNamedBuy', BaseSimulation.process_action, ('name', 'commodity_id',
-                                                                              'price', 'amount'), '')
-        Action.add_action_type('AddNamedSell', BaseSimulation.process_action, ('name', 'commodity_id',
-                                                                               'price', 'amount'), '')
-        Action.add_action_type('BuyNoKeep', BaseSimulation.process_action, ('commodity_id',
-                                                                            'price', 'amount'), '')
-        Action.add_action_type('SellNoKeep', BaseSimulation.process_action, ('commodity_id',
-                                                                             'price', 'amount'), '')
+        Action.add_action_type('PayWages', BaseSimulation.action_pay_wages, ('payment',), '')
+        Action.add_action_type('ProductionLabour', BaseSimulation.action_production_labour,
+                               ('commodity', 'num_workers', 'payment',), '')
+        Action.add_action_type('AddNamedBuy', BaseSimulation.action_add_named_buy, ('slot', 'commodity_id',
+                                                                                    'price', 'amount'), '')
+        Action.add_action_type('AddNamedSell', BaseSimulation.action_add_named_sell, ('slot', 'commodity_id',
+                                                                                      'price', 'amount'), '')
+        Action.add_action_type('BuyNoKeep', BaseSimulation.action_buy_no_keep, ('commodity_id',
+                                                                                'price', 'amount'), '')
+        Action.add_action_type('SellNoKeep', BaseSimulation.action_sell_no_keep, ('commodity_id',
+                                                                                  'price', 'amount'), '')
 
     def add_location(self, location):
         self.add_entity(location)
         self.Locations.append(location.GID)
+        coords = getattr(location, 'Coordinates', None)
+        if coords is not None:
+            self.LocationCoords[location.GID] = coords
 
     def add_commodity(self, commodity):
         self.add_entity(commodity)
         self.Commodities.append(commodity.GID)
+        self.CommoditiesByName[commodity.Name] = commodity.GID
 
     def add_household(self, household):
         """
@@ -827,9 +980,42 @@ class BaseSimulation(simulation.Simulation):
         """
         self.add_entity(household)
         self.Households[household.LocationID] = household.GID
+        self.HouseholdRefs[household.LocationID] = household
 
     def get_market(self, loc_id, commod_id):
-        return self.Markets[(loc_id, commod_id)]
+        return self.Markets[market_key(loc_id, commod_id)]
+
+    def get_market_by_name(self, loc_id, commodity_name):
+        """
+        Get a Market by location and commodity name. Goes through the commodity name
+        index, so the Markets dict itself only holds the canonical (loc_id, commod_id)
+        keys.
+
+        :param loc_id: int
+        :param commodity_name: str
+        :return: Market
+        """
+        return self.Markets[market_key(loc_id, self.CommoditiesByName[commodity_name])]
+
+    def nearest_location(self, coords):
+        """
+        Return the GID of the location with coordinates closest to coords (or None if no
+        location has coordinates).
+
+        The number of locations is small, so this is a linear scan over the
+        LocationCoords cache maintained by add_location().
+
+        :param coords: tuple
+        :return: int
+        """
+        best_id = None
+        best_dist = None
+        for loc_id, loc_coords in self.LocationCoords.items():
+            dist = math.dist(coords, loc_coords)
+            if (best_dist is None) or (dist < best_dist):
+                best_dist = dist
+                best_id = loc_id
+        return best_id
 
     def get_commodity_by_name(self, commodity_name):
         """
@@ -839,25 +1025,27 @@ class BaseSimulation(simulation.Simulation):
         :param commodity_name: str
         :return: Entity
         """
-        for c in self.Commodities:
-            c_obj = agent_based_macro.entity.Entity.get_entity(c)
-            if c_obj.Name == commodity_name:
-                return c
+        return self.CommoditiesByName.get(commodity_name)
 
     def generate_markets(self):
         """
         Call this after all locations and commodities are built, so long as you want all combinations supported
         :return:
         """
+        # Resolve names once, rather than calling get_entity() inside the product loop.
+        commods = [(commod_id, agent_based_macro.entity.Entity.get_entity(commod_id).Name)
+                   for commod_id in self.Commodities]
         for loc_id in self.Locations:
-            loc = agent_based_macro.entity.Entity.get_entity(loc_id)
-            for commod_id in self.Commodities:
-                com = agent_based_macro.entity.Entity.get_entity(commod_id)
-                name = f'{com.Name}@{loc.Name}'
+            loc_name = agent_based_macro.entity.Entity.get_entity(loc_id).Name
+            for commod_id, commod_name in commods:
+                name = f'{commod_name}@{loc_name}'
                 market = Market(name, loc_id, commod_id)
                 self.add_entity(market)
-                self.Markets[(loc_id, commod_id)] = market
-                self.Markets[(loc_id, com.Name)] = market
+                self.Markets[market_key(loc_id, commod_id)] = market
+        # Setup is complete once the markets exist: freeze the GID lists so hot-path
+        # iteration is over tuples, and accidental later mutation fails loudly.
+        self.Locations = tuple(self.Locations)
+        self.Commodities = tuple(self.Commodities)
 
     def pay_taxes(self, taxpayer_gid, amount):
         """
@@ -871,8 +1059,7 @@ class BaseSimulation(simulation.Simulation):
         except KeyError:
             return
         sucker.spend_money(amount, ReserveType.TAX)
-        cgov = agent_based_macro.entity.Entity.get_entity(self.CentralGovernmentID)
-        cgov.receive_money(amount)
+        self.CentralGovernment.receive_money(amount)
 
     def get_action_data(self, agent, **kwargs):
         """
@@ -897,83 +1084,85 @@ class BaseSimulation(simulation.Simulation):
             return JG.Wage
         raise ValueError(f'Unhandled Data Request: {kwargs["request"]}')
 
-    def process_action(self, agent, **kwargs):
+    def action_pay_wages(self, agent, **kwargs):
+        """
+        Handler for the 'PayWages' action.
+
+        :param agent: Agent
+        :return:
         """
-        Handle actions associated with this class.
+        # We assume that there is only a single aggregated Household to get all wages.
+        household: HouseholdSector = self.HouseholdRefs[agent.LocationID]
+        amount = int(kwargs['payment'])
+        agent.spend_money(amount=amount)
+        household.receive_wages(amount=amount)
 
-        This is a clumsy architecture - will split into individual handlers.
+    def action_add_named_buy(self, agent, **kwargs):
+        """
+        Handler for the 'AddNamedBuy' action.
 
         :param agent: Agent
-        :param action: Action
         :return:
         """
-        # Switch to match for Python 3.10
-        if kwargs['action_type'] == 'PayWages':
-            # We assume that there is only a single aggregated Household to get all wages.
-            household_id = self.Households[agent.LocationID]
-            household: HouseholdSector = agent_based_macro.entity.Entity.get_entity(household_id)
-            amount = int(kwargs['payment'])
-            agent.spend_money(amount=amount)
-            household.receive_wages(amount=amount)
-        elif kwargs['action_type'] == 'ProductionLabour':
-            commodity = kwargs['commodity']
-            num_workers = kwargs['num_workers']
-            payment = kwargs['payment']
-            self.action_production_labour(agent, commodity, num_workers, payment)
-        elif kwargs['action_type'] == 'AddNamedBuy':
-            name = kwargs['name']
-            commodity_id = kwargs['commodity_id']
-            price = kwargs['price']
-            amount = kwargs['amount']
-            market = self.get_market(agent.LocationID, commodity_id)
-            order = BuyOrder(price, amount, agent.GID)
-            market.add_named_buy(agent, name, order)
-        elif kwargs['action_type'] == 'AddNamedSell':
-            name = kwargs['name']
-            commodity_id = kwargs['commodity_id']
-            price = kwargs['price']
-            amount = kwargs['amount']
-            market = self.get_market(agent.LocationID, commodity_id)
-            order = SellOrder(price, amount, agent.GID)
-            market.add_named_sell(agent, name, order)
-        elif kwargs['action_type'] == 'BuyNoKeep':
-            commodity_id = kwargs['commodity_id']
-            price = kwargs['price']
-            amount = kwargs['amount']
-            market = self.get_market(agent.LocationID, commodity_id)
-            order = BuyOrder(price, amount, agent.GID)
-            order.KeepInQueue = False
-            try:
-                market.add_buy(order)
-            except errors.NoFreeMoneyError:
-                if agent.GID in self.PlayerGID:
-                    event = simulation.Event(self.GID, self.event_send_invalid_action, self.Time, None,
-                                             response='NoFreeMoney')
-                    simulation.queue_event(event)
-                else:
-                    raise
-        elif kwargs['action_type'] == 'SellNoKeep':
-            commodity_id = kwargs['commodity_id']
-            price = kwargs['price']
-            amount = kwargs['amount']
-            market = self.get_market(agent.LocationID, commodity_id)
-            order = SellOrder(price, amount, agent.GID)
-            order.KeepInQueue = False
-            try:
-                market.add_sell(order)
-            except errors.CommodityReserveError:
-                if agent.GID in self.PlayerGID:
-                    event = simulation.Event(self.GID, self.event_send_invalid_action, self.Time, None,
-                                             response='NotEnoughCommodity')
-                    simulation.queue_event(event)
-                else:
-                    raise
-        else:
-            # NOTE: Should not reach this point.
-            raise ValueError(f'Unknown Action arguments: {kwargs}')
+        market = self.get_market(agent.LocationID, kwargs['commodity_id'])
+        order = BuyOrder(kwargs['price'], kwargs['amount'], agent.GID)
+        market.add_named_buy(agent, kwargs['slot'], order)
+
+    def action_add_named_sell(self, agent, **kwargs):
+        """
+        Handler for the 'AddNamedSell' action.
+
+        :param agent: Agent
+        :return:
+        """
+        market = self.get_market(agent.LocationID, kwargs['commodity_id'])
+        order = SellOrder(kwargs['price'], kwargs['amount'], agent.GID)
+        market.add_named_sell(agent, kwargs['slot'], order)
+
+    def action_buy_no_keep(self, agent, **kwargs):
+        """
+        Handler for the 'BuyNoKeep' action: a buy order that is not left in the queue.
+
+        :param agent: Agent
+        :return:
+        """
+        market = self.get_market(agent.LocationID, kwargs['commodity_id'])
+        order = BuyOrder(kwargs['price'], kwargs['amount'], agent.GID)
+        order.KeepInQueue = False
+        try:
+            market.add_buy(order)
+        except errors.NoFreeMoneyError:
+            if agent.GID in self.PlayerGID:
+                event = simulation.Event(self.GID, self.event_send_invalid_action, self.Time, None,
+                                         response='NoFreeMoney')
+                simulation.queue_event(event)
+            else:
+                raise
+
+    def action_sell_no_keep(self, agent, **kwargs):
+        """
+        Handler for the 'SellNoKeep' action: a sell order that is not left in the queue.
+
+        :param agent: Agent
+        :return:
+        """
+        market = self.get_market(agent.LocationID, kwargs['commodity_id'])
+        order = SellOrder(kwargs['price'], kwargs['amount'], agent.GID)
+        order.KeepInQueue = False
+        try:
+            market.add_sell(order)
+        except errors.CommodityReserveError:
+            if agent.GID in self.PlayerGID:
+                event = simulation.Event(self.GID, self.event_send_invalid_action, self.Time, None,
+                                         response='NotEnoughCommodity')
+                simulation.queue_event(event)
+            else:
+                raise
 
-    def action_production_labour(self, agent, commodity, num_workers, payment):
+    def action_production_labour(self, agent, **kwargs):
         """
+        Handler for the 'ProductionLabour' action.
+
         Note: can either pass the commodity_id, or the name.
 
         Right now, production depends upon a productivity parameter that is location-based.
@@ -982,11 +1171,10 @@ class BaseSimulation(simulation.Simulation):
         within the Agent itself, just filling in missing data.
 
         :param agent: Agent
-        :param commodity: int
-        :param num_workers: int
-        :param payment: int
         :return:
         """
+        commodity = kwargs['commodity']
+        payment = kwargs['payment']
         if type(commodity) is str:
             commodity_id = self.get_commodity_by_name(commodity)
         else:
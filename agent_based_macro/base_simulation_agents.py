@@ -18,11 +18,10 @@ Copyright 2021 Brian Romanchuk
 
 
 import math
-import weakref
 
 import agent_based_macro.entity
 from agent_based_macro import simulation as simulation
-from agent_based_macro.base_simulation import ProductionAgent, Inventory, Agent, ReserveType
+from agent_based_macro.base_simulation import ProductionAgent, Inventory, Agent, ReserveType, NamedOrderSlot
 
 
 class ProducerLabour(ProductionAgent):
@@ -53,14 +52,15 @@ class ProducerLabour(ProductionAgent):
         # Once units are produced, balance from CapitalisedWages is transferred to InventoryCost.
         self.CapitalisedWages = 0
         self.IsEmployer = True
+        # Lazily resolved 'Fud' commodity GID; the commodity set is fixed after setup,
+        # so there is no need to route the lookup through a data request every day.
+        self.FoodID = None
 
     def register_events(self):
         hiring_event = simulation.Event(self.GID, self.event_hiring, .05, 1.)
         hiring_event.add_data_request('JG_Wage', request='JG_Wage')
         production_event = simulation.Event(self.GID, self.event_production, .5, 1.)
         sales_event = simulation.Event(self.GID, self.event_sales, .75, 1.)
-        sales_event.add_data_request('Productivity', request="Productivity", commodity='Fud')
-        sales_event.add_data_request('FudID', request='CommodityID', commodity='Fud')
         return [(hiring_event, (0., 0.2)),
                 (production_event, (.21, .5)),
                 (sales_event, (.02, .99))]
@@ -83,22 +83,27 @@ class ProducerLabour(ProductionAgent):
         :param args:
         :return:
         """
-        payment = self.get_daily_wage_bill()
+        # Hoist the worker count and compute the wage bill once, so both actions share the
+        # same values without repeated attribute loads.
+        workers = self.WorkersActual
+        payment = workers * self.Wage
         self.time_series_set('wage_payment', payment)
         self.add_action(action_type='PayWages', payment=payment)
         # JG Production
-        self.add_action(action_type='ProductionLabour', commodity='Fud', num_workers=self.WorkersActual,
+        self.add_action(action_type='ProductionLabour', commodity='Fud', num_workers=workers,
                         payment=payment)
 
     def event_sales(self, *args):
         # for now, just sell at fixed price...
         self.time_series_set('money', self.Money)
-        fud_id = self.ActionData['FudID']
+        fud_id = self.FoodID
+        if fud_id is None:
+            self.FoodID = fud_id = self.Simulation.get_commodity_by_name('Fud')
         unit_cost = self.unit_cost(fud_id)
         # Aim for a 10% profit margin
         amount = math.ceil(self.Inventory[fud_id].Amount*.99)
         if amount > 0:
-            self.add_action(action_type='AddNamedSell', name='production', commodity_id=fud_id,
+            self.add_action(action_type='AddNamedSell', slot=NamedOrderSlot.SELL_PRODUCTION, commodity_id=fud_id,
                             price=unit_cost * 1.1, amount=amount)
 
 
@@ -112,16 +117,40 @@ class TravellingAgent(Agent):
         self.StartTime = 0.
         self.Speed = speed
         self.TargetLocID = travelling_to_id
-        target = agent_based_macro.entity.Entity.get_entity(travelling_to_id)
-        self.TargetCoordinates = target.Coordinates
+        self.TargetCoordinates = self._look_up_coordinates(travelling_to_id)
         self.ArrivalTime = 0.
-        if self.StartCoordinates == target.Coordinates:
+        # Per-tick position cache: get_representation() can be hit repeatedly at the
+        # same simulation time (e.g., multiple clients polling), so remember the last
+        # interpolated position and the time it was computed for.
+        self.CachedCoordinates = None
+        self.CachedCoordinatesTime = None
+        # Precomputed motion parameters, set in start_moving(), so the position
+        # interpolation is a multiply-add per dimension with no division.
+        self.InverseDuration = 0.
+        self.DeltaCoordinates = None
+        # In-transit flag, maintained by start_moving() and the arrival handling in
+        # get_coordinates(), so the common stationary case is a single bool check.
+        self.IsMoving = False
+        if self.StartCoordinates == self.TargetCoordinates:
             # Already there
             self.StartLocID = travelling_to_id
             self.LocationID = self.StartLocID
         else:
             raise NotImplementedError('No support for spawning ship away from planet')
 
+    def _look_up_coordinates(self, loc_id):
+        """
+        Get the coordinates of a location, preferring the simulation's LocationCoords
+        cache over resolving the Location entity.
+
+        :param loc_id: int
+        :return: tuple
+        """
+        try:
+            return self.Simulation.LocationCoords[loc_id]
+        except KeyError:
+            return agent_based_macro.entity.Entity.get_entity(loc_id).Coordinates
+
     def get_coordinates(self, ttime):
         """
         For now, the server will calculate all locations and update upon request.
@@ -129,7 +158,7 @@ class TravellingAgent(Agent):
         :param ttime: float
         :return:
         """
-        if self.StartLocID == self.TargetLocID:
+        if not self.IsMoving:
             self.LocationID = self.StartLocID
             return self.StartCoordinates
         else:
@@ -140,13 +169,19 @@ class TravellingAgent(Agent):
                 self.LocationID = self.TargetLocID
                 self.LocationID = self.StartLocID
                 self.StartCoordinates = self.TargetCoordinates
+                self.IsMoving = False
                 return self.TargetCoordinates
             else:
                 # progess is in [0,1]
-                progress = (ttime - self.StartTime) / (self.ArrivalTime - self.StartTime)
-                # Support N-dimensional spaces
-                out = [s + progress * (t - s) for s, t in zip(self.StartCoordinates, self.TargetCoordinates)]
-                return tuple(out)
+                progress = (ttime - self.StartTime) * self.InverseDuration
+                start = self.StartCoordinates
+                delta = self.DeltaCoordinates
+                if len(start) == 2:
+                    # The game map is 2-D; build the pair directly rather than going
+                    # through a generator and zip iterator.
+                    return (start[0] + progress * delta[0], start[1] + progress * delta[1])
+                # Generic N-dimensional support.
+                return tuple(s + progress * d for s, d in zip(start, delta))
 
     def start_moving(self, new_target, ttime):
         """
@@ -161,25 +196,32 @@ class TravellingAgent(Agent):
         self.StartCoordinates = coords
         self.LocationID = TravellingAgent.NoLocationID
         self.TargetLocID = new_target
-        target_loc = agent_based_macro.entity.Entity.get_entity(new_target)
-        self.TargetCoordinates = target_loc.Coordinates
-        # Calculate distance
-        dist = 0.
-        for x1, x2 in zip(self.StartCoordinates, self.TargetCoordinates):
-            dist += pow(x1 - x2, 2)
-        dist = math.sqrt(dist)
+        self.TargetCoordinates = self._look_up_coordinates(new_target)
+        # Calculate distance: math.dist() does the squared-difference loop in C.
+        dist = math.dist(self.StartCoordinates, self.TargetCoordinates)
         self.ArrivalTime = ttime + dist / self.Speed
+        # Precompute the interpolation parameters for get_coordinates().
+        if self.ArrivalTime > self.StartTime:
+            self.InverseDuration = 1.0 / (self.ArrivalTime - self.StartTime)
+        else:
+            self.InverseDuration = 0.
+        self.DeltaCoordinates = tuple(t - s for s, t in zip(self.StartCoordinates, self.TargetCoordinates))
+        self.IsMoving = True
 
     def get_representation(self):
         info = super().get_representation()
-        if self.StartLocID == self.TargetLocID:
+        if not self.IsMoving:
             # Easy case: not moving.
             coords = self.StartCoordinates
             location = self.StartLocID
         else:
-            sim = simulation.get_simulation()
-            ttime = sim.Time
-            coords = self.get_coordinates(ttime)
+            ttime = self.Simulation.Time
+            if ttime == self.CachedCoordinatesTime:
+                coords = self.CachedCoordinates
+            else:
+                coords = self.get_coordinates(ttime)
+                self.CachedCoordinates = coords
+                self.CachedCoordinatesTime = ttime
             location = self.LocationID
         info['Coordinates'] = coords
         info['Location'] = location
@@ -216,7 +258,11 @@ class JobGuarantee(ProductionAgent):
         self.IsCentralGovernment = True
         # Will find the HouseholdGID later...
         self.HouseholdGID = None
-        self.EmployerDict = weakref.WeakValueDictionary()
+        # Lazily resolved 'Fud' commodity GID (see ProducerLabour.FoodID).
+        self.FoodID = None
+        # GIDs of the employers on this location. Entity liveness is re-checked on use,
+        # so no need for the weakref bookkeeping of a WeakValueDictionary.
+        self.EmployerGIDs = []
 
     def spend_money(self, amount, from_reserve=ReserveType.NONE):
         self.get_entity(self.CentralGovID).spend_money(amount)
@@ -231,14 +277,19 @@ class JobGuarantee(ProductionAgent):
         Once we can have creation/destruction of employers, will need to update live.
         :return:
         """
-        self.EmployerDict = weakref.WeakValueDictionary()
-        sim = self.get_entity(agent_based_macro.entity.SIMULATION_ID)
-        for ent in sim.EntityList:
-            if ent.GID == self.GID:
+        self.EmployerGIDs = []
+        sim = self.Simulation
+        # Use the per-location entity index; re-validate the location in case an
+        # indexed entity has moved (or died, in which case get_entity() throws).
+        for gid in sim.EntitiesByLocation.get(self.LocationID, ()):
+            if gid == self.GID:
                 continue
-            if ent.Type == 'agent' and ent.LocationID == self.LocationID:
-                if ent.IsEmployer:
-                    self.EmployerDict[ent.GID] = ent
+            try:
+                ent = self.get_entity(gid)
+            except KeyError:
+                continue
+            if ent.Type == 'agent' and ent.LocationID == self.LocationID and ent.IsEmployer:
+                self.EmployerGIDs.append(gid)
 
     def register_events(self):
         """
@@ -264,7 +315,7 @@ class JobGuarantee(ProductionAgent):
 
         Note: for simplicity, do all processing inside this function, instead of using Actions.
         """
-        if len(self.EmployerDict) == 0:
+        if len(self.EmployerGIDs) == 0:
             self.find_employers()
         # Do in two passes.
         # 1) Handle firing, if any. Find employers looking for workers.
@@ -278,7 +329,12 @@ class JobGuarantee(ProductionAgent):
         total_population = self.WorkersActual
         # Firing pass. Workers go to Job Guarantee immediately.
         employer: Agent
-        for employer_id, employer in self.EmployerDict.items():
+        for employer_gid in self.EmployerGIDs:
+            try:
+                employer = self.get_entity(employer_gid)
+            except KeyError:
+                # Employer no longer exists; skip (the list is rebuilt on creation/destruction).
+                continue
             total_population += employer.WorkersActual
             hires = employer.TargetWorkers -  employer.WorkersActual
             # If hires = 0, no changes.
@@ -289,7 +345,7 @@ class JobGuarantee(ProductionAgent):
                 self.WorkersActual -= hires
                 employer.WorkersActual = employer.TargetWorkers
             elif hires > 0:
-                employers_hiring.append(employer_id)
+                employers_hiring.append(employer)
                 total_hires += hires
         # Pass two: if there are workers in the JobGuarantee, they go to private workers.
         # TODO: Add wage logic. Right now, since wages are fixed, do not need to take wages into account.
@@ -300,8 +356,7 @@ class JobGuarantee(ProductionAgent):
             # Since not every employer can get their desired workers, be unfair and give rounded up portions to
             # employers in order. This means that employers at the end of the list will miss out if there are fractions.
             assignment_fraction = float(actual_hires)/float(total_hires)
-            for employer_id in employers_hiring:
-                employer = self.EmployerDict[employer_id]
+            for employer in employers_hiring:
                 num_hired = math.ceil(assignment_fraction*(employer.TargetWorkers-employer.WorkersActual))
                 # No rounding above the number of workers to be hired
                 num_hired = min(num_hired, actual_hires)
@@ -330,19 +385,20 @@ class JobGuarantee(ProductionAgent):
         """
         # Since the HouseholdSector and central government are indestructible (I hope), this transfer will always
         # be valid. (Normally, need to validate existence of all entities.)
-        payment = self.get_daily_wage_bill()
+        food_id = self.FoodID
+        if food_id is None:
+            self.FoodID = food_id = self.Simulation.get_commodity_by_name('Fud')
+        # Hoist the worker count and compute the wage bill once for both actions.
+        workers = self.WorkersActual
+        payment = workers * self.Wage
         self.add_action(action_type='PayWages', payment=payment)
         # JG Production
-        self.add_action(action_type='ProductionLabour', commodity='Fud', num_workers=self.WorkersActual,
+        self.add_action(action_type='ProductionLabour', commodity=food_id, num_workers=workers,
                         payment=payment)
-        # The data needed by event_set_orders: the productivity of Fud production, as well as the ID of Fud.
-        # Note: Should save the FoodID in the class, since needed every time.
-        data_queries = {
-            'Productivity': {'request': 'Productivity', 'commodity': 'Fud'},
-            'FudID': {'request': 'CommodityID', 'commodity': 'Fud'}
-        }
+        # event_set_orders reads the cached FoodID and the memoised productivity directly,
+        # so no data requests have to ride along with the delayed event.
         self.add_action(action_type='QueueEventWithDelay', GID=self.GID, callback=self.event_set_orders, delay=.1,
-                        data_requests=data_queries)
+                        data_requests=None)
 
     def event_set_orders(self, *args):
         """
@@ -356,19 +412,22 @@ class JobGuarantee(ProductionAgent):
         (3) 'emergency': sale of remainder at 150% of production cost.
         :return:
         """
-        food_id = self.ActionData['FudID']
-        productivity = self.ActionData['Productivity']
+        food_id = self.FoodID
+        if food_id is None:
+            self.FoodID = food_id = self.Simulation.get_commodity_by_name('Fud')
+        productivity = self.get_productivity(food_id)
         production_price = self.Wage / productivity
         # Create a floor
         price = production_price * .95
         amount = 300
-        self.add_action(action_type='AddNamedBuy', name='floor', commodity_id=food_id, price=price, amount=amount)
+        self.add_action(action_type='AddNamedBuy', slot=NamedOrderSlot.BUY_FLOOR, commodity_id=food_id, price=price,
+                        amount=amount)
         available = self.Inventory[food_id].Amount - self.Inventory[food_id].Reserved
         production_amount = int(available*0.7)
-        self.add_action(action_type='AddNamedSell', name='production', commodity_id=food_id,
+        self.add_action(action_type='AddNamedSell', slot=NamedOrderSlot.SELL_PRODUCTION, commodity_id=food_id,
                         price=production_price * 1.1, amount=production_amount)
         self.time_series_set('production', production_price * 1.1 * production_amount)
         remainder = available - production_amount
-        self.add_action(action_type='AddNamedSell', name='emergency', commodity_id=food_id, price=production_price * 1.5,
-                        amount=remainder)
+        self.add_action(action_type='AddNamedSell', slot=NamedOrderSlot.SELL_EMERGENCY, commodity_id=food_id,
+                        price=production_price * 1.5, amount=remainder)
         self.time_series_set('emergency', production_price * 1.5 * remainder)
\ No newline at end of file
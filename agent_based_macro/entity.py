@@ -46,6 +46,11 @@ class EntityDead(KeyError):
 
 
 class Entity(object):
+    # Class-level flag: does the entity have a LocationID member? Subclasses that are tied to
+    # a location override this, so location filtering is a class attribute read instead of a
+    # hasattr() probe per entity.
+    HasLocation = False
+
     def __init__(self, name='', ttype=''):
         self.GID = add_entity(self)
         self.Name = name
@@ -151,16 +156,6 @@ class Action(object):
         self.KWArgs = kwargs
         self.check_valid()
 
-    def do_action(self, sim, agent):
-        """
-        DEPRECATED. Implementation is now within the Simulation subclass (or external handlers that are
-        patched in). Leaving this for now...
-
-
-        :return:
-        """
-        raise NotImplementedError('do_action() not implemented in this class')
-
     def check_valid(self):
         """
         Does the Action have the required arguments?
@@ -35,8 +35,12 @@ class OrderType(enum.Enum):
 
 
 class OrderQueue(object):
+    __slots__ = ('Orders', 'OrderMap')
+
     def __init__(self):
         self.Orders = []
+        # OrderID -> order lookup, so removal by ID does not need to scan the queue.
+        self.OrderMap = {}
 
     def __getitem__(self, item):
         return self.Orders[item]
@@ -44,18 +48,19 @@ class OrderQueue(object):
     def __len__(self):
         return len(self.Orders)
 
-    def check_empty(self):
+    def pop_front(self):
         """
-        If the front order has an Amount of 0, pop it. Since the quantity has been reduced to zero,
-        no accounting issues.
+        Pop the front order unconditionally. The caller checks that the front order's
+        Amount has been reduced to zero first (so there are no accounting issues),
+        which saves re-inspecting the head on every fill.
         :return:
         """
-        if len(self.Orders) > 0:
-            if self.Orders[0].Amount == 0:
-                self.Orders.pop(0)
+        front = self.Orders.pop(0)
+        del self.OrderMap[front.OrderID]
 
     def insert_order(self, order):
         bisect.insort_right(self.Orders, order)
+        self.OrderMap[order.OrderID] = order
 
     def remove_order(self, order_id):
         """
@@ -65,19 +70,17 @@ class OrderQueue(object):
         :param order_id:
         :return: BaseOrder
         """
-        found = None
-        for order in self.Orders:
-            if order.OrderID == order_id:
-                found = order
-                break
+        found = self.OrderMap.pop(order_id, None)
         if found is not None:
             self.Orders.remove(found)
-            return found
-        else:
-            return None
+        return found
 
 
 class BaseOrder(ABC):
+    # Orders are created in large numbers; __slots__ keeps them small and speeds up
+    # attribute access. '__weakref__' is needed since orders live in GOrderDict.
+    __slots__ = ('Price', 'Amount', 'OrderID', 'FirmGID', 'KeepInQueue', '__weakref__')
+
     def __init__(self, price, amount, firm_gid):
         if amount <= 0:
             raise ValueError('Amount must be strictly positive')
@@ -106,12 +109,16 @@ class BaseOrder(ABC):
 
 
 class BuyOrder(BaseOrder):
+    __slots__ = ()
+
     def __lt__(self, other):
         """Comparison order for insertion into OrderQueue"""
         return self.Price > other.Price
 
 
 class SellOrder(BaseOrder):
+    __slots__ = ()
+
     def __lt__(self, other):
         return self.Price < other.Price
 
@@ -127,6 +134,29 @@ class MarketBase(object):
         self.SellList = OrderQueue()
         self.LastPrice = None
         self.LastTime = None
+        # Cached top-of-book: (price, amount) tuples, or None if the queue is empty.
+        # Refreshed at the end of every mutating operation, so read-mostly paths
+        # (get_bid/get_ask/get_representation) never have to poke the order queues.
+        self.BestBid = None
+        self.BestAsk = None
+
+    def update_top_of_book(self):
+        """
+        Refresh the cached BestBid/BestAsk. Called at the end of every operation that
+        can mutate the order queues.
+
+        :return:
+        """
+        try:
+            front = self.BuyList[0]
+            self.BestBid = (front.Price, front.Amount)
+        except IndexError:
+            self.BestBid = None
+        try:
+            front = self.SellList[0]
+            self.BestAsk = (front.Price, front.Amount)
+        except IndexError:
+            self.BestAsk = None
 
     def get_time(self):
         """
@@ -181,39 +211,59 @@ class MarketBase(object):
                            buy_order.Price)
         # If the buy price is less than the ask, we insert into BuyList
         # Otherwise, we transact until either the buy order is completely filled, or
-        # the ask has risen past the new order's bid
+        # the ask has risen past the new order's bid.
+        # The buyer-side fill accounting is batched per price level: counterparty orders
+        # at the same price generate a single buyer 'fill' operation. (Sellers still get
+        # individual fills, since they are distinct agents.)
+        level_price = None
+        level_amount = 0
         while True:
             try:
-                ask = self.SellList[0].Price
+                sell_head = self.SellList[0]
             except IndexError:
-                ask = None
-            if (ask is None) or (buy_order.Price < ask):
-                # Bid price is below ask, so add to BuyList
-                if buy_order.KeepInQueue:
-                    self.BuyList.insert_order(buy_order)
-                else:
-                    self.do_accounting(buy_order.FirmGID, OrderType.BUY, 'remove', buy_order.Amount,
-                                       buy_order.Price)
-                return
+                sell_head = None
+            if (sell_head is None) or (buy_order.Price < sell_head.Price):
+                break
+            ask = sell_head.Price
+            if ask != level_price:
+                # Moved to a new price level: flush the accumulated buyer fill.
+                if level_amount > 0:
+                    self.do_accounting(firm_gid=buy_order.FirmGID, order_type=OrderType.BUY,
+                                       operation='fill', amount=level_amount, price=level_price)
+                level_price = ask
+                level_amount = 0
+            # Transaction!
+            amount = min(sell_head.Amount, buy_order.Amount)
+            self.do_accounting(firm_gid=sell_head.FirmGID, order_type=OrderType.SELL,
+                               operation='fill', amount=amount, price=ask)
+            self.log_transaction(buy_id=buy_order.FirmGID, sell_id=sell_head.FirmGID,
+                                 initiated_id=buy_order.FirmGID, amount=amount, price=ask)
+            # Then, decrease both order sizes by the fill amount.
+            level_amount += amount
+            buy_order.Amount -= amount
+            sell_head.Amount -= amount
+            # Remove the front of the sell list if empty.
+            if sell_head.Amount == 0:
+                self.SellList.pop_front()
+            if buy_order.Amount == 0:
+                # Order has been cleared out, quit processing.
+                break
+        if level_amount > 0:
+            self.do_accounting(firm_gid=buy_order.FirmGID, order_type=OrderType.BUY,
+                               operation='fill', amount=level_amount, price=level_price)
+        if level_price is not None:
+            # Only the last transaction's price/time survive, so update once after the
+            # loop rather than calling get_time() on every fill.
+            self.LastPrice = level_price
+            self.LastTime = self.get_time()
+        if buy_order.Amount > 0:
+            # Bid price is below ask, so add to BuyList
+            if buy_order.KeepInQueue:
+                self.BuyList.insert_order(buy_order)
             else:
-                # Transaction!
-                self.LastPrice = ask
-                self.LastTime = self.get_time()
-                amount = min(self.SellList[0].Amount, buy_order.Amount)
-                self.do_accounting(firm_gid=buy_order.FirmGID, order_type=OrderType.BUY,
-                                   operation='fill', amount=amount, price=ask)
-                self.do_accounting(firm_gid=self.SellList[0].FirmGID, order_type=OrderType.SELL,
-                                   operation='fill', amount=amount, price=ask)
-                self.log_transaction(buy_id=buy_order.FirmGID, sell_id=self.SellList[0].FirmGID,
-                                     initiated_id=buy_order.FirmGID, amount=amount, price=ask)
-                # Then, decrease both order sizes by the fill amount.
-                buy_order.Amount -= amount
-                self.SellList[0].Amount -= amount
-                # Remove the front of the sell list if empty.
-                self.SellList.check_empty()
-                if buy_order.Amount == 0:
-                    # Order has been cleared out, quit processing.
-                    return
+                self.do_accounting(buy_order.FirmGID, OrderType.BUY, 'remove', buy_order.Amount,
+                                   buy_order.Price)
+        self.update_top_of_book()
 
     def add_sell(self, sell_order):
         """
@@ -236,39 +286,57 @@ class MarketBase(object):
                            sell_order.Price)
         # If the buy price is less than the ask, we insert into BuyList
         # Otherwise, we transact until either the buy order is completely filled, or
-        # the ask has risen past the new order's bid
+        # the ask has risen past the new order's bid.
+        # The seller-side fill accounting is batched per price level, mirroring add_buy().
+        level_price = None
+        level_amount = 0
         while True:
             try:
-                bid = self.BuyList[0].Price
+                buy_head = self.BuyList[0]
             except IndexError:
-                bid = None
-            if (bid is None) or (sell_order.Price > bid):
-                # No transaction
-                if sell_order.KeepInQueue:
-                    self.SellList.insert_order(sell_order)
-                else:
-                    self.do_accounting(sell_order.FirmGID, OrderType.SELL, 'remove', sell_order.Amount,
-                                       sell_order.Price)
-                return
+                buy_head = None
+            if (buy_head is None) or (sell_order.Price > buy_head.Price):
+                break
+            bid = buy_head.Price
+            if bid != level_price:
+                # Moved to a new price level: flush the accumulated seller fill.
+                if level_amount > 0:
+                    self.do_accounting(firm_gid=sell_order.FirmGID, order_type=OrderType.SELL,
+                                       operation='fill', amount=level_amount, price=level_price)
+                level_price = bid
+                level_amount = 0
+            # Transaction!
+            amount = min(buy_head.Amount, sell_order.Amount)
+            self.do_accounting(firm_gid=buy_head.FirmGID, order_type=OrderType.BUY,
+                               operation='fill', amount=amount, price=bid)
+            self.log_transaction(buy_id=buy_head.FirmGID, sell_id=sell_order.FirmGID,
+                                 initiated_id=sell_order.FirmGID, amount=amount, price=bid)
+            # Then, decrease both order sizes by the fill amount.
+            level_amount += amount
+            sell_order.Amount -= amount
+            buy_head.Amount -= amount
+            # Remove the front of the buy list if empty.
+            if buy_head.Amount == 0:
+                self.BuyList.pop_front()
+            if sell_order.Amount == 0:
+                # Order has been cleared out, quit processing.
+                break
+        if level_amount > 0:
+            self.do_accounting(firm_gid=sell_order.FirmGID, order_type=OrderType.SELL,
+                               operation='fill', amount=level_amount, price=level_price)
+        if level_price is not None:
+            # Only the last transaction's price/time survive, so update once after the
+            # loop rather than calling get_time() on every fill.
+            self.LastPrice = level_price
+            self.LastTime = self.get_time()
+        if sell_order.Amount > 0:
+            # No transaction possible at this price: add to SellList
+            if sell_order.KeepInQueue:
+                self.SellList.insert_order(sell_order)
             else:
-                # Transaction!
-                self.LastPrice = bid
-                self.LastTime = self.get_time()
-                amount = min(self.BuyList[0].Amount, sell_order.Amount)
-                self.do_accounting(firm_gid=sell_order.FirmGID, order_type=OrderType.SELL,
-                                   operation='fill', amount=amount, price=bid)
-                self.do_accounting(firm_gid=self.BuyList[0].FirmGID, order_type=OrderType.BUY,
-                                   operation='fill', amount=amount, price=bid)
-                self.log_transaction(buy_id=self.BuyList[0].FirmGID, sell_id=sell_order.FirmGID,
-                                     initiated_id=sell_order.FirmGID, amount=amount, price=bid)
-                # Then, decrease both order sizes by the fill amount.
-                sell_order.Amount -= amount
-                self.BuyList[0].Amount -= amount
-                # Remove the front of the sell list if empty.
-                self.BuyList.check_empty()
-                if sell_order.Amount == 0:
-                    # Order has been cleared out, quit processing.
-                    return
+                self.do_accounting(sell_order.FirmGID, OrderType.SELL, 'remove', sell_order.Amount,
+                                   sell_order.Price)
+        self.update_top_of_book()
 
     def remove_order(self, order_id):
         """
@@ -297,6 +365,7 @@ class MarketBase(object):
         if found is not None:
             self.do_accounting(firm_gid=found.FirmGID, order_type=order_type, operation='remove',
                                amount=found.Amount, price=found.Price)
+            self.update_top_of_book()
 
     def log_transaction(self, buy_id, sell_id, initiated_id, amount, price):
         """
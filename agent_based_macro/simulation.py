@@ -352,16 +352,6 @@ class Simulation(ABC, Entity):
             handler = Action.GHandlers[action.KWArgs['action_type']]
             handler(self, ent, **action.KWArgs)
 
-    def process_action(self, agent, action):
-        """
-        DEPRECATED
-
-        :param action: Action
-        :param agent: Agent
-        :return:
-        """
-        pass
-
     @abstractmethod
     def get_action_data(self, agent, **kwargs):
         """
@@ -435,11 +425,14 @@ class Simulation(ABC, Entity):
         :param fill: float
         :param freq: float
         :param name: str
-        :return:
+        :return: TimeSeries
         """
         if name in self.TimeSeriesDict:
             raise ValueError(f'Time series with name "{name}" is already registered')
-        self.TimeSeriesDict[name] = utils.TimeSeries(freq=freq, fill=fill)
+        ts = utils.TimeSeries(freq=freq, fill=fill)
+        self.TimeSeriesDict[name] = ts
+        # Return the series so callers can keep a direct reference for writes.
+        return ts
 
     def time_series_add(self, name, value):
         ts : utils.TimeSeries = self.TimeSeriesDict[name]
@@ -21,3 +21,32 @@ class TestInventory(TestCase):
         self.assertEqual(COGS+COGS2, 201)
         self.assertEqual(0, info.Cost)
         self.assertEqual(0, info.Amount)
+
+    def test_COGS_rounding(self):
+        info = base_simulation.InventoryInfo(1)
+        info.add_inventory(3, 10)
+        # 10*1/3 = 3.33... rounds down to 3.
+        self.assertEqual(3, info.remove_inventory(1))
+        # 7*1/2 = 3.5, round half up.
+        self.assertEqual(4, info.remove_inventory(1))
+        # Removing the rest always recovers the remaining cost exactly.
+        self.assertEqual(3, info.remove_inventory(1))
+        self.assertEqual(0, info.Cost)
+
+
+class TestAgentSpendMoney(TestCase):
+    def test_spend_unreserved(self):
+        agent = base_simulation.Agent('testy', money_balance=100)
+        agent.spend_money(30)
+        self.assertEqual(70, agent.Money)
+        self.assertEqual(0, agent.ReserveMoney)
+
+    def test_spend_from_reserve_single_debit(self):
+        # Money and the reserve buckets must each be debited exactly once.
+        agent = base_simulation.Agent('testy', money_balance=100)
+        agent.change_reserves(40, base_simulation.ReserveType.ORDERS)
+        self.assertEqual(40, agent.ReserveMoney)
+        agent.spend_money(30, from_reserve=base_simulation.ReserveType.ORDERS)
+        self.assertEqual(70, agent.Money)
+        self.assertEqual(10, agent.ReserveOrders)
+        self.assertEqual(10, agent.ReserveMoney)